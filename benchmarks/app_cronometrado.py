@@ -0,0 +1,39 @@
+"""
+Dashboard com cronômetros, executado pelo benchmark_interacoes.py via AppTest
+
+Executa o insight.py do projeto sem disparar o main() e o envolve, assim como os painéis
+executados como fragmentos, com cronômetros. Os tempos da última execução ficam em
+st.session_state['tempos'] (nome -> segundos).
+"""
+
+import os
+import runpy
+import sys
+import time
+
+import streamlit as st
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAINEIS_FRAGMENTOS = ('dashboard_calendario', 'dashboard_simulacao_comissoes')
+if PASTA_PROJETO not in sys.path:
+    sys.path.insert(0, PASTA_PROJETO)
+
+modulo = runpy.run_path(os.path.join(PASTA_PROJETO, 'insight.py'), run_name='insight_cronometrado')
+globais = modulo['main'].__globals__
+tempos = st.session_state.setdefault('tempos', {})
+tempos.clear()
+
+
+def cronometrado(nome, funcao):
+    def executar(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            tempos[nome] = time.perf_counter() - inicio
+    return executar
+
+
+for nome in PAINEIS_FRAGMENTOS:
+    globais[nome] = cronometrado(nome, globais[nome])
+cronometrado('main', globais['main'])()
@@ -0,0 +1,116 @@
+"""
+Benchmark das análises recalculadas a cada reexecução do dashboard (filtros + todas as análises)
+
+Compara o código original (seis funções que percorrem e agrupam as vendas filtradas a cada
+reexecução, mais os agrupamentos da aba de distribuição) com o código atual (filtro do cubo
+pré-agregado, totais do período anterior pelo índice diário e todas as análises de
+AnalisesPeriodo, sem o cache da sessão). Os indicadores principais das duas versões são conferidos.
+
+Uso:
+    python benchmarks/benchmark_analises.py [--linhas N] [--repeticoes N]
+"""
+
+import argparse
+import datetime
+import time
+
+import numpy as np
+
+from comum import (
+    cronometrar, esquema_anterior, gerar_vendas, importar_insight, importar_revisao, processar_vendas,
+    revisao_original
+)
+
+# Período filtrado (dois dos três anos das vendas geradas) e período anterior de mesma duração
+PERIODO = (datetime.date(2021, 6, 1), datetime.date(2023, 5, 31))
+ANALISES = [
+    'metricas', 'vendas_mensais', 'analise_dias', 'analise_horas', 'distribuicao', 'metricas_vendedores',
+    'vendas_vendedor_mes', 'vendas_vendedor_semana', 'vendas_diarias'
+]
+
+
+def periodo_anterior(periodo):
+    dias_periodo = (periodo[1] - periodo[0]).days + 1
+    fim = periodo[0] - datetime.timedelta(days=1)
+    return fim - datetime.timedelta(days=dias_periodo - 1), fim
+
+
+def distribuicao_original(df, coluna_valor):
+    """Agrupamentos que a aba de distribuição do código original fazia a cada reexecução"""
+    vendas_por_semana = df.groupby('semana_mes').agg({coluna_valor: ['sum', 'count', 'mean'], 'data': 'nunique'})
+
+    def obter_periodo(hora):
+        if 8 <= hora < 12:
+            return 'Manhã (8h-12h)'
+        elif 12 <= hora < 18:
+            return 'Tarde (12h-18h)'
+        elif hora >= 18:
+            return 'Noite (18h+)'
+        return 'Madrugada (0h-8h)'
+
+    df_temp = df.copy()
+    df_temp['periodo_dia'] = df_temp['hora'].apply(obter_periodo)
+    dist_dia_periodo = df_temp.groupby(['dia_semana_pt', 'periodo_dia']).agg({coluna_valor: ['sum', 'count']})
+    return vendas_por_semana, dist_dia_periodo
+
+
+def reexecucao_original(original, df):
+    """Filtros e análises de uma reexecução do main() original"""
+    df_filtrado = original.aplicar_filtros(df, PERIODO, ['Todos'], 'vendedor', False)
+    df_anterior = original.aplicar_filtros(df, periodo_anterior(PERIODO), ['Todos'], 'vendedor', False)
+    metricas = original.gerar_metricas(df_filtrado, 'valor_total', df_anterior)
+    original.calcular_metricas_mensais(df_filtrado, 'valor_total')
+    original.calcular_metricas_por_vendedor(df_filtrado, 'valor_total', 'vendedor')
+    original.analisar_dias_semana(df_filtrado, 'valor_total')
+    original.analisar_horas(df_filtrado, 'valor_total')
+    distribuicao_original(df_filtrado, 'valor_total')
+    return metricas
+
+
+def reexecucao_atual(insight, dados):
+    """Filtros e análises de uma reexecução do main() atual, calculando todas as abas"""
+    cubo_filtrado = insight.aplicar_filtros(dados['cubo'], PERIODO, ['Todos'], 'vendedor', False)
+    totais_anteriores = insight.consultar_indice_diario(
+        dados['indice_diario'], [periodo_anterior(PERIODO)], ['Todos'], False
+    ).iloc[0]
+    analises = insight.AnalisesPeriodo(cubo_filtrado, 'vendedor', totais_anteriores)
+    for nome in ANALISES:
+        getattr(analises, nome)
+    return analises.metricas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    argumentos = parser.parse_args()
+
+    insight = importar_insight()
+    original = importar_revisao(revisao_original(), 'insight_original')
+
+    df = processar_vendas(insight, gerar_vendas(argumentos.linhas))
+    inicio = time.perf_counter()
+    cubo = insight.construir_cubo_vendas(df, 'valor_total', 'vendedor')
+    dados = {'cubo': cubo, 'indice_diario': insight.construir_indice_diario(cubo, 'vendedor')}
+    tempo_cubo = time.perf_counter() - inicio
+    df_original = esquema_anterior(df, datas_como_objetos=True)
+
+    # As duas versões devem chegar aos mesmos indicadores principais
+    metricas_original = reexecucao_original(original, df_original)
+    metricas_atual = reexecucao_atual(insight, dados)
+    for chave, valor in metricas_original.items():
+        assert np.isclose(float(valor), float(metricas_atual[chave]), rtol=1e-9, equal_nan=True), chave
+
+    tempo_original = cronometrar(lambda: reexecucao_original(original, df_original), argumentos.repeticoes)
+    tempo_atual = cronometrar(lambda: reexecucao_atual(insight, dados), argumentos.repeticoes)
+
+    print(f"{argumentos.linhas:,} vendas, cubo com {len(cubo):,} linhas "
+          f"(montado uma vez no carregamento em {tempo_cubo:.2f}s)")
+    print(f"Reexecução (filtros + análises), melhor de {argumentos.repeticoes}:")
+    print(f"  código original:  {tempo_original:.3f}s")
+    print(f"  código atual:     {tempo_atual:.3f}s ({tempo_original / tempo_atual:.0f}x)")
+    print("Indicadores principais iguais nas duas versões")
+
+
+if __name__ == '__main__':
+    main()
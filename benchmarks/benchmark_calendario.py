@@ -0,0 +1,124 @@
+"""
+Benchmark de enriquecer_calendario (colunas de calendário das vendas)
+
+Compara a versão vetorizada com o código original (apply linha a linha, reproduzido abaixo) e
+confere, em cada tamanho em que o original é executado, que as colunas e os valores são os mesmos
+e que os tipos são os do esquema compacto.
+
+Uso:
+    python benchmarks/benchmark_calendario.py [linhas ...] [--max-original N]
+
+    linhas: tamanhos testados (padrão: 100000 1000000 10000000)
+    --max-original: maior tamanho em que o código original é executado (padrão: 1000000; com
+                    10 milhões de linhas o apply original leva vários minutos e esgota a memória)
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from comum import cronometrar, esquema_anterior, gerar_vendas, importar_insight
+
+# Tipos das colunas criadas por enriquecer_calendario (esquema compacto)
+TIPOS_ESPERADOS = {
+    'data': 'datetime64[us]',
+    'mes': 'int8',
+    'ano': 'int16',
+    'dia_mes': 'int8',
+    'hora': 'int8',
+    'dia_semana_num': 'int8',
+    'semana_mes': 'int8',
+    'mes_ano': 'category',
+    'mes_ano_ordem': 'category',
+    'dia_semana': 'category',
+    'dia_semana_pt': 'category',
+    'mes_pt': 'category',
+    'horario_comercial': 'bool'
+}
+
+
+def safe_int(x, default=0):
+    """Mesma conversão segura para inteiro usada pelo código original"""
+    if pd.isna(x) or np.isinf(x):
+        return default
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def enriquecer_calendario_original(df_valido, coluna_data):
+    """Colunas de calendário como o código original as calculava em carregar_dados"""
+    df_valido['data'] = df_valido[coluna_data].dt.date
+    df_valido['mes'] = df_valido[coluna_data].dt.month.apply(safe_int, default=1)
+    df_valido['ano'] = df_valido[coluna_data].dt.year.apply(safe_int, default=2000)
+    df_valido['dia_mes'] = df_valido[coluna_data].dt.day.apply(safe_int, default=1)
+    df_valido['hora'] = df_valido[coluna_data].dt.hour.apply(safe_int, default=0)
+    df_valido['dia_semana_num'] = df_valido[coluna_data].dt.weekday.apply(safe_int, default=0)
+    df_valido['semana_mes'] = df_valido['dia_mes'].apply(lambda x: ((x - 1) // 7 + 1) if x > 0 else 1)
+    df_valido['mes_ano'] = df_valido.apply(
+        lambda row: f"{row['mes']:02d}/{row['ano']}" if pd.notna(row['mes']) and pd.notna(row['ano']) else "00/0000",
+        axis=1
+    )
+    df_valido['mes_ano_ordem'] = df_valido.apply(
+        lambda row: f"{row['ano']}-{row['mes']:02d}" if pd.notna(row['mes']) and pd.notna(row['ano']) else "0000-00",
+        axis=1
+    )
+    df_valido['dia_semana'] = df_valido[coluna_data].dt.day_name()
+    dias_traduzidos = {
+        'Monday': 'Segunda-feira', 'Tuesday': 'Terça-feira', 'Wednesday': 'Quarta-feira',
+        'Thursday': 'Quinta-feira', 'Friday': 'Sexta-feira', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
+    }
+    df_valido['dia_semana_pt'] = df_valido['dia_semana'].map(dias_traduzidos)
+    meses_traduzidos = {
+        1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
+        7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
+    }
+    df_valido['mes_pt'] = df_valido['mes'].map(meses_traduzidos)
+
+    def esta_em_horario_comercial(row):
+        if row['dia_semana_num'] == 6:
+            return False
+        hora = row['hora']
+        if row['dia_semana_num'] == 5:
+            return 8 <= hora < 17
+        return 8 <= hora < 19
+
+    df_valido['horario_comercial'] = df_valido.apply(esta_em_horario_comercial, axis=1)
+    return df_valido
+
+
+def conferir_paridade(atual, original):
+    """Mesmas colunas e valores que o código original, com os tipos do esquema compacto"""
+    tipos = {coluna: str(atual[coluna].dtype) for coluna in TIPOS_ESPERADOS}
+    assert tipos == TIPOS_ESPERADOS, f"tipos diferentes do esquema compacto: {tipos}"
+    pd.testing.assert_frame_equal(esquema_anterior(atual, datas_como_objetos=True), original)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('linhas', nargs='*', type=int, default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--max-original', type=int, default=1_000_000)
+    argumentos = parser.parse_args()
+
+    insight = importar_insight()
+    print(f"{'linhas':>11} | {'original (apply)':>16} | {'vetorizado':>10} | {'ganho':>6} | paridade")
+    for qtd_linhas in argumentos.linhas:
+        vendas = gerar_vendas(qtd_linhas)[['data_venda', 'valor_total']]
+        tempo_atual = cronometrar(lambda: insight.enriquecer_calendario(vendas, 'data_venda'), repeticoes=1)
+
+        if qtd_linhas <= argumentos.max_original:
+            inicio = time.perf_counter()
+            original = enriquecer_calendario_original(vendas.copy(), 'data_venda')
+            tempo_original = time.perf_counter() - inicio
+            conferir_paridade(insight.enriquecer_calendario(vendas, 'data_venda'), original)
+            print(f"{qtd_linhas:>11,} | {tempo_original:>15.2f}s | {tempo_atual:>9.3f}s | "
+                  f"{tempo_original / tempo_atual:>5.0f}x | ok")
+        else:
+            print(f"{qtd_linhas:>11,} | {'não executado':>16} | {tempo_atual:>9.3f}s | {'-':>6} | -")
+
+
+if __name__ == '__main__':
+    main()
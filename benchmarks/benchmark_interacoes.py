@@ -0,0 +1,110 @@
+"""
+Benchmark da latência das interações nos painéis executados como fragmentos
+
+Abre o dashboard com uma planilha de vendas sintéticas (1 milhão de linhas por padrão) pelo
+AppTest do Streamlit e mede, para a troca de ano no calendário e para a troca de um parâmetro do
+simulador de comissões:
+    - a reexecução completa do script (o que toda interação custava antes dos fragmentos);
+    - o main() e o corpo do painel, cronometrados por app_cronometrado.py.
+Com fragmentos, a interação reexecuta apenas o corpo do painel. O AppTest sempre reexecuta o
+script inteiro, então os tempos do painel são do corpo da função, não latências medidas no navegador.
+
+A planilha é gerada na pasta de trabalho e reaproveitada nas execuções seguintes (gerar e ler uma
+planilha de 1 milhão de linhas leva alguns minutos; depois, o cache em disco em Parquet é usado).
+
+Uso:
+    python benchmarks/benchmark_interacoes.py [--linhas N] [--pasta PASTA] [--repeticoes N]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from comum import gerar_vendas
+
+APP_CRONOMETRADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_cronometrado.py')
+
+
+def preparar_pasta(pasta, qtd_linhas):
+    """Cria a pasta de trabalho com a planilha de vendas (a única planilha da pasta)"""
+    os.makedirs(pasta, exist_ok=True)
+    planilha = os.path.join(pasta, f'Vendas_{qtd_linhas}.xlsx')
+    if not os.path.exists(planilha):
+        print(f"Gerando {planilha} ...", flush=True)
+        vendas = gerar_vendas(qtd_linhas).rename(
+            columns={'data_venda': 'Data Venda', 'valor_total': 'Valor Total', 'vendedor': 'Vendedor'}
+        )
+        vendas.to_excel(planilha + '.tmp.xlsx', index=False)
+        os.replace(planilha + '.tmp.xlsx', planilha)
+    for nome in os.listdir(pasta):
+        if nome.endswith('.xlsx') and nome != os.path.basename(planilha):
+            os.remove(os.path.join(pasta, nome))
+
+
+def medir(app, rotulo, aba, interacao, painel, repeticoes):
+    """
+    Mede a reexecução causada pela interação com o painel da aba. O AppTest não guarda a aba aberta
+    entre as execuções (no navegador ela continua aberta), então a aba é aberta antes de cada medição
+    e informada de novo na execução medida.
+    """
+    tempos_execucao = []
+    tempos_app = []
+    for i in range(repeticoes):
+        app.session_state['aba_ativa'] = aba
+        app.run()
+        app.session_state['aba_ativa'] = aba
+        inicio = time.perf_counter()
+        interacao(i)
+        tempos_execucao.append(time.perf_counter() - inicio)
+        tempos_app.append(dict(app.session_state['tempos']))
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    melhor = min(range(repeticoes), key=tempos_execucao.__getitem__)
+    print(f"| {rotulo} | {tempos_execucao[melhor]:.2f} s | {tempos_app[melhor]['main']:.2f} s | "
+          f"{tempos_app[melhor][painel]:.3f} s |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--pasta', default=os.path.join(tempfile.gettempdir(), 'dashboard_benchmark_interacoes'))
+    parser.add_argument('--repeticoes', type=int, default=3)
+    argumentos = parser.parse_args()
+
+    preparar_pasta(argumentos.pasta, argumentos.linhas)
+    os.chdir(argumentos.pasta)
+    logging.disable(logging.WARNING)  # avisos do Streamlit sobre a execução pelo AppTest
+
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP_CRONOMETRADO, default_timeout=3600)
+
+    # Primeira execução carrega os dados; a segunda deixa os caches aquecidos
+    inicio = time.perf_counter()
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    print(f"Carregamento inicial ({argumentos.linhas:,} linhas): {time.perf_counter() - inicio:.1f} s")
+
+    print("| Interação | Reexecução completa | main() | Corpo do painel |")
+    print("|---|---|---|---|")
+
+    medir(
+        app, "Troca de ano no calendário", "Calendário",
+        lambda i: app.selectbox(key='ano_selector').select_index(i % 2).run(),
+        'dashboard_calendario', argumentos.repeticoes
+    )
+
+    def trocar_percentual(i):
+        campo = next(campo for campo in app.number_input if campo.label.startswith('Percentual de comissão sobre'))
+        campo.set_value(1.0 + (i + 1) / 10).run()
+
+    medir(
+        app, "Parâmetro do simulador", "Simulação de Comissões", trocar_percentual,
+        'dashboard_simulacao_comissoes', argumentos.repeticoes
+    )
+
+
+if __name__ == '__main__':
+    main()
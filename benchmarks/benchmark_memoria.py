@@ -0,0 +1,72 @@
+"""
+Relatório de memória do esquema compacto das vendas (antes e depois)
+
+Processa vendas sintéticas como processar_planilha e compara o esquema compacto (rótulos
+categóricos, partes da data em int8/int16) com o esquema anterior (rótulos como texto, partes da
+data em int64), reconstruído coluna a coluna: memória por coluna (insight.relatorio_memoria),
+memória do cubo, custo da cópia por sessão (pickle) e tempo dos agrupamentos mais usados.
+
+Uso:
+    python benchmarks/benchmark_memoria.py [--linhas N] [--por-coluna]
+"""
+
+import argparse
+import pickle
+
+import pandas as pd
+
+from comum import cronometrar, esquema_anterior, gerar_vendas, importar_insight, processar_vendas
+
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--por-coluna', action='store_true', help="mostra a memória de cada coluna")
+    argumentos = parser.parse_args()
+
+    insight = importar_insight()
+    df = processar_vendas(insight, gerar_vendas(argumentos.linhas))
+    cubo = insight.construir_cubo_vendas(df, 'valor_total', 'vendedor')
+    versoes = {
+        'anterior': {'df': esquema_anterior(df), 'cubo': esquema_anterior(cubo)},
+        'compacto': {'df': df, 'cubo': cubo}
+    }
+
+    relatorio = insight.relatorio_memoria(df)
+    if argumentos.por_coluna:
+        print((relatorio.drop(columns='tipo').astype(float) / 1e6).round(2).rename(
+            columns={'bytes_atual': 'MB compacto', 'bytes_anterior': 'MB anterior'}
+        ).to_string())
+        print()
+
+    linhas = []
+    for nome, versao in versoes.items():
+        copia = pickle.dumps(versao)
+        linhas.append({
+            'esquema': nome,
+            'vendas (MB)': megabytes(versao['df']),
+            'cubo (MB)': megabytes(versao['cubo']),
+            'pickle (MB)': len(copia) / 1e6,
+            'pickle (ms)': cronometrar(lambda: pickle.dumps(versao)) * 1000,
+            'unpickle (ms)': cronometrar(lambda: pickle.loads(copia)) * 1000,
+            'vendedor x mês (ms)': cronometrar(
+                lambda: versao['df'].groupby(['vendedor', 'mes_ano'], observed=True)['valor_total'].sum()
+            ) * 1000,
+            'dia da semana x hora (ms)': cronometrar(
+                lambda: versao['df'].groupby(['dia_semana_pt', 'hora'], observed=True)['valor_total'].sum()
+            ) * 1000,
+            'montar cubo (ms)': cronometrar(
+                lambda: insight.construir_cubo_vendas(versao['df'], 'valor_total', 'vendedor'), repeticoes=2
+            ) * 1000
+        })
+
+    print(f"{argumentos.linhas:,} vendas (pickle = cópia por sessão feita pelo st.cache_data)")
+    print(pd.DataFrame(linhas).set_index('esquema').T.round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Funções comuns aos benchmarks do Dashboard Gerencial de Vendas
+
+Os benchmarks importam insight.py fora do `streamlit run` (modo "bare" do Streamlit) e comparam
+o código atual com o código original do repositório, lido do histórico do git.
+"""
+
+import importlib.util
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Vendedores das vendas sintéticas
+VENDEDORES = ['ANA', 'BRUNO', 'CARLA', 'DIEGO', 'EDUARDA', 'FABIO', 'GABRIELA', 'HENRIQUE']
+
+
+# Função para importar um arquivo Python como módulo, a partir da pasta do projeto
+def _importar_arquivo(caminho, nome_modulo):
+    diretorio_anterior = os.getcwd()
+    os.chdir(PASTA_PROJETO)
+    if PASTA_PROJETO not in sys.path:
+        sys.path.insert(0, PASTA_PROJETO)
+    # Sem os avisos do Streamlit sobre a execução fora do `streamlit run`
+    logging.disable(logging.WARNING)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            especificacao = importlib.util.spec_from_file_location(nome_modulo, caminho)
+            modulo = importlib.util.module_from_spec(especificacao)
+            sys.modules[nome_modulo] = modulo
+            especificacao.loader.exec_module(modulo)
+    finally:
+        logging.disable(logging.NOTSET)
+        os.chdir(diretorio_anterior)
+    return modulo
+
+
+def importar_insight():
+    """Importa o insight.py atual (a página é executada uma vez, sem dados carregados)"""
+    if 'insight' in sys.modules:
+        return sys.modules['insight']
+    return _importar_arquivo(os.path.join(PASTA_PROJETO, 'insight.py'), 'insight')
+
+
+def revisao_original():
+    """Primeiro commit do repositório (código original do dashboard)"""
+    return subprocess.run(
+        ['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=PASTA_PROJETO, capture_output=True, text=True, check=True
+    ).stdout.split()[0]
+
+
+def importar_revisao(revisao, nome_modulo):
+    """
+    Importa o insight.py de uma revisão do git com outro nome de módulo, para comparar com o atual.
+
+    Args:
+        revisao: Commit, branch ou tag (ex.: revisao_original())
+        nome_modulo: Nome do módulo importado (ex.: 'insight_original')
+    """
+    conteudo = subprocess.run(
+        ['git', 'show', f'{revisao}:insight.py'], cwd=PASTA_PROJETO, capture_output=True, check=True
+    ).stdout
+    pasta = tempfile.mkdtemp(prefix='benchmark_')
+    caminho = os.path.join(pasta, f'{nome_modulo}.py')
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+    return _importar_arquivo(caminho, nome_modulo)
+
+
+def gerar_vendas(qtd_linhas, semente=0, anos=3):
+    """
+    Gera vendas sintéticas em horário de loja (7h às 21h), ordenadas por data, com as colunas
+    data_venda, valor_total (float) e vendedor (texto), como lidas da planilha.
+    """
+    rng = np.random.default_rng(semente)
+    dias = rng.integers(0, anos * 365, qtd_linhas)
+    segundos = rng.integers(7 * 3600, 21 * 3600, qtd_linhas)
+    momentos = pd.Timestamp('2021-01-01') + pd.to_timedelta(dias * 86400 + segundos, unit='s')
+    vendas = pd.DataFrame({
+        'data_venda': momentos,
+        'valor_total': rng.gamma(2, 100, qtd_linhas).round(2),
+        'vendedor': rng.choice(VENDEDORES, qtd_linhas)
+    })
+    return vendas.sort_values('data_venda', kind='stable', ignore_index=True)
+
+
+def processar_vendas(insight, vendas):
+    """Aplica às vendas geradas as mesmas etapas de processar_planilha que vêm depois da leitura"""
+    vendas = vendas.copy()
+    vendas['vendedor'] = vendas['vendedor'].astype('category')
+    return insight.enriquecer_calendario(vendas, 'data_venda')
+
+
+def esquema_anterior(df, datas_como_objetos=False):
+    """
+    Reconstrói o DataFrame no esquema anterior ao compacto: rótulos categóricos como texto e partes
+    da data como int64 (as mesmas regras de insight.relatorio_memoria). Com datas_como_objetos,
+    a coluna 'data' volta a ser de objetos datetime.date, como no código original.
+    """
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(str)
+        elif serie.dtype.kind in 'iu' and serie.dtype.itemsize < 8:
+            serie = serie.astype(np.int64)
+        colunas[coluna] = serie
+    anterior = pd.DataFrame(colunas, index=df.index)
+    if datas_como_objetos and 'data' in anterior:
+        anterior['data'] = anterior['data'].dt.date
+    return anterior
+
+
+def cronometrar(funcao, repeticoes=3):
+    """Executa a função uma vez para aquecer e retorna o menor tempo (em segundos) das repetições"""
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
@@ -0,0 +1,306 @@
+"""
+Motor de regras de comissão do Dashboard Gerencial de Vendas
+
+Módulo sem dependência do Streamlit: é importado por insight.py e também pelos processos do pool
+da simulação Monte Carlo, que só precisam das regras de cálculo (importar insight.py num processo
+novo executaria a página inteira).
+"""
+
+import numpy as np
+
+# Tentar importar o arquivo de configuração
+try:
+    from config import CONFIG
+except ImportError:
+    CONFIG = {}
+
+# Modo de valores exatos (ver insight.py): comissões arredondadas para o centavo
+VALORES_EM_CENTAVOS = bool(CONFIG.get("valores_em_centavos", False))
+
+# Função para arredondar valores em reais para o centavo como na folha (meio centavo para cima)
+def arredondar_centavos(valores):
+    """
+    Arredonda valores em reais para o centavo pelo arredondamento comercial: o meio centavo sobe
+    (R$ 0,125 -> R$ 0,13) e, em valores negativos, afasta-se do zero (-R$ 0,125 -> -R$ 0,13).
+    O np.rint arredondaria o meio centavo para o par (R$ 0,125 -> R$ 0,12).
+
+    Os valores em centavos são antes arredondados na 4ª casa decimal, para que o erro do ponto
+    flutuante não decida o lado do meio centavo (1,005 * 100 = 100,49999999999999).
+
+    Args:
+        valores: Número ou array com valores em reais
+
+    Returns:
+        Array com os valores arredondados para o centavo
+    """
+    centavos = np.round(np.asarray(valores, dtype=float) * 100, 4)
+    return np.sign(centavos) * np.floor(np.abs(centavos) + 0.5) / 100
+
+# Função para calcular comissões por faixas de forma vetorizada
+def calcular_comissao_faixas(valores, faixas, modo='faixa'):
+    """
+    Calcula o percentual e o valor da comissão por faixas para qualquer quantidade de valores
+    de uma só vez (busca binária nos limites das faixas, sem laço por vendedor).
+
+    Args:
+        valores: Array ou Series (de qualquer formato) com os totais de venda
+        faixas: Lista de dicionários com valor_min, valor_max e comissao_pct (faixas sem sobreposição).
+                Os limites e percentuais também podem ser arrays que fazem broadcasting com valores
+                (varredura de parâmetros); nesse caso as faixas devem vir em ordem crescente
+        modo: 'faixa' - o percentual da faixa em que o total está vale sobre todo o valor;
+              'marginal' - cada parte do valor recebe o percentual da sua faixa (como no IR)
+
+    Returns:
+        Tupla (percentual efetivo, valor da comissão), arrays no formato de valores (ou do broadcasting)
+    """
+    valores = np.asarray(valores, dtype=float)
+    if not faixas:
+        return np.zeros(valores.shape), np.zeros(valores.shape)
+    
+    # Limites variáveis: comparar cada faixa com broadcasting (poucas faixas, muitos cenários)
+    if any(np.ndim(faixa[campo]) > 0 for faixa in faixas for campo in ('valor_min', 'valor_max', 'comissao_pct')):
+        if modo == 'marginal':
+            comissao = 0.0
+            for faixa in faixas:
+                parte = np.where(valores >= faixa['valor_min'], np.minimum(valores, faixa['valor_max']) - faixa['valor_min'], 0.0)
+                comissao = comissao + faixa['comissao_pct'] / 100 * parte
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentual = np.where(valores > 0, comissao / valores * 100, 0.0)
+        else:
+            # Percentual da primeira faixa que contém o valor
+            percentual = 0.0
+            for faixa in reversed(faixas):
+                percentual = np.where((valores >= faixa['valor_min']) & (valores < faixa['valor_max']), faixa['comissao_pct'], percentual)
+            comissao = np.where(percentual != 0, valores * (percentual / 100), 0.0)
+        return percentual, comissao
+    
+    # Limites ordenados pelo início de cada faixa
+    faixas = sorted(faixas, key=lambda faixa: faixa['valor_min'])
+    minimos = np.array([faixa['valor_min'] for faixa in faixas], dtype=float)
+    maximos = np.array([faixa['valor_max'] for faixa in faixas], dtype=float)
+    percentuais = np.array([faixa['comissao_pct'] for faixa in faixas], dtype=float)
+    
+    # Faixa candidata: a de maior início que não passa do valor (-1 = abaixo da primeira faixa)
+    posicao = np.searchsorted(minimos, valores, side='right') - 1
+    dentro = (posicao >= 0) & ~np.isnan(valores)
+    posicao = np.maximum(posicao, 0)
+    
+    if modo == 'marginal':
+        # Comissão integral das faixas anteriores + parte do valor dentro da faixa atual
+        comissao_faixas_completas = np.concatenate([[0.0], np.cumsum(percentuais[:-1] / 100 * (maximos[:-1] - minimos[:-1]))])
+        parte_na_faixa = np.minimum(valores, maximos[posicao]) - minimos[posicao]
+        comissao = np.where(dentro, comissao_faixas_completas[posicao] + percentuais[posicao] / 100 * parte_na_faixa, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentual = np.where(dentro & (valores > 0), comissao / valores * 100, 0.0)
+    else:
+        # O percentual da faixa vale sobre todo o valor (valores fora de qualquer faixa não recebem)
+        na_faixa = dentro & (valores < maximos[posicao])
+        percentual = np.where(na_faixa, percentuais[posicao], 0.0)
+        comissao = np.where(na_faixa, valores * (percentual / 100), 0.0)
+    
+    return percentual, comissao
+
+# Faixas usadas quando o modelo progressivo não informa as suas
+FAIXAS_PADRAO = [
+    {'valor_min': 0, 'valor_max': 50000, 'comissao_pct': 0.5},
+    {'valor_min': 50000, 'valor_max': 100000, 'comissao_pct': 1.0},
+    {'valor_min': 100000, 'valor_max': float('inf'), 'comissao_pct': 1.5}
+]
+
+# Degraus da comissão progressiva por metas (percentual da meta atingido -> comissão sobre as vendas)
+FAIXAS_META_PADRAO = [
+    {'atingimento_min': 80, 'comissao_pct': 0.5},
+    {'atingimento_min': 100, 'comissao_pct': 1.0},
+    {'atingimento_min': 120, 'comissao_pct': 1.5}
+]
+
+# Valores usados para os parâmetros que o modelo não informa
+PARAMETROS_PADRAO_COMISSAO = {
+    'salario_base': 3000,
+    'comissao_pct': 1.0,
+    'bonus_pct': 0.5,
+    'meta_tipo': 'valor',
+    'meta_valor': 50000,
+    'meta_percentual': 5.0,
+    'faixas': FAIXAS_PADRAO,
+    'faixas_meta': FAIXAS_META_PADRAO,
+    'modo_faixas': 'faixa'
+}
+
+# Modelos de comissão declarados como regras. Cada regra soma uma parte da comissão:
+#   'percentual'  - percentual do parâmetro sobre todas as vendas
+#                   (com 'condicao': 'meta', apenas para quem atingiu a meta)
+#   'faixas'      - faixas de valor de vendas (ver calcular_comissao_faixas)
+#   'faixas_meta' - faixas de percentual da meta atingido (progressiva por metas)
+# 'meta': True indica que o modelo calcula a meta (valor fixo ou acima da média da equipe)
+MODELOS_COMISSAO = {
+    'fixo_zerado': {'meta': False, 'regras': []},
+    'fixo': {'meta': False, 'regras': [{'tipo': 'percentual', 'parametro': 'comissao_pct'}]},
+    'meta_binaria': {'meta': True, 'regras': [{'tipo': 'percentual', 'parametro': 'comissao_pct', 'condicao': 'meta'}]},
+    'meta_bonus': {'meta': True, 'regras': [
+        {'tipo': 'percentual', 'parametro': 'comissao_pct'},
+        {'tipo': 'percentual', 'parametro': 'bonus_pct', 'condicao': 'meta'}
+    ]},
+    'progressivo': {'meta': False, 'regras': [{'tipo': 'faixas', 'parametro': 'faixas'}]},
+    'progressivo_metas': {'meta': True, 'regras': [{'tipo': 'faixas_meta', 'parametro': 'faixas_meta'}]}
+}
+
+# Função para montar a função de cálculo de um modelo de comissão a partir das suas regras
+def compilar_modelo_comissao(modelo, parametros):
+    """
+    Resolve as regras do modelo e os parâmetros uma única vez e devolve uma função que calcula a
+    comissão de um array de totais de qualquer formato cujo último eixo são os vendedores
+    (ex.: meses x vendedores). A meta "acima da média" usa a média da equipe em cada linha.
+    Os parâmetros podem ser números ou arrays com broadcasting (varredura de parâmetros).
+
+    Args:
+        modelo: Nome do modelo em MODELOS_COMISSAO ('meta' equivale a 'meta_binaria' ou 'meta_bonus',
+                conforme parametros['apenas_com_meta'])
+        parametros: Dicionário com parâmetros do modelo
+
+    Returns:
+        Função totais -> dicionário com percentual, comissao, meta_atingida e meta_valor
+        (os dois últimos são None em modelos sem meta)
+    """
+    if modelo == "meta":
+        modelo = "meta_binaria" if parametros.get('apenas_com_meta', False) else "meta_bonus"
+    if modelo not in MODELOS_COMISSAO:
+        raise ValueError(f"Modelo de comissão desconhecido: {modelo}")
+    especificacao = MODELOS_COMISSAO[modelo]
+    
+    def parametro(nome):
+        return parametros.get(nome, PARAMETROS_PADRAO_COMISSAO[nome])
+    
+    modo_faixas = parametro('modo_faixas')
+    meta_por_valor = parametro('meta_tipo') == 'valor'
+    meta_valor_fixo = parametro('meta_valor')
+    fator_media = 1 + parametro('meta_percentual') / 100
+    
+    # Percentuais simples (somados e aplicados de uma vez) e regras com faixas
+    percentuais = [(parametro(regra['parametro']), regra.get('condicao') == 'meta')
+                   for regra in especificacao['regras'] if regra['tipo'] == 'percentual']
+    faixas_valor = [parametro(regra['parametro']) for regra in especificacao['regras'] if regra['tipo'] == 'faixas']
+    faixas_meta = [sorted(parametro(regra['parametro']), key=lambda faixa: faixa['atingimento_min'])
+                   for regra in especificacao['regras'] if regra['tipo'] == 'faixas_meta']
+    
+    def calcular(totais):
+        totais = np.asarray(totais, dtype=float)
+        meta_valor = meta_atingida = None
+        if especificacao['meta']:
+            meta_valor = meta_valor_fixo if meta_por_valor else np.nanmean(totais, axis=-1, keepdims=True) * fator_media
+            meta_atingida = totais >= meta_valor
+        
+        percentual = 0.0
+        for valor_pct, apenas_com_meta in percentuais:
+            percentual = percentual + (np.where(meta_atingida, valor_pct, 0) if apenas_com_meta else valor_pct)
+        comissao = totais * (percentual / 100) if percentuais else np.zeros(totais.shape)
+        
+        # Faixas de valor e faixas de percentual da meta (convertidas em valores pela meta)
+        faixas_calculo = list(faixas_valor)
+        for degraus in faixas_meta:
+            limites = [meta_valor * degrau['atingimento_min'] / 100 for degrau in degraus] + [float('inf')]
+            faixas_calculo.append([
+                {'valor_min': limites[k], 'valor_max': limites[k + 1], 'comissao_pct': degrau['comissao_pct']}
+                for k, degrau in enumerate(degraus)
+            ])
+        for faixas in faixas_calculo:
+            percentual_faixa, comissao_faixa = calcular_comissao_faixas(totais, faixas, modo_faixas)
+            percentual = percentual + percentual_faixa
+            comissao = comissao + comissao_faixa
+        
+        # Modo de valores exatos: comissão de cada vendedor arredondada para o centavo, como na folha
+        # (meio centavo para cima, ver arredondar_centavos)
+        if VALORES_EM_CENTAVOS:
+            comissao = arredondar_centavos(comissao)
+        
+        return {
+            'percentual': np.broadcast_to(percentual, np.broadcast_shapes(np.shape(percentual), totais.shape)),
+            'comissao': comissao,
+            'meta_atingida': meta_atingida,
+            'meta_valor': meta_valor
+        }
+    
+    return calcular
+
+# Função para aplicar um modelo de comissão a uma matriz de totais de venda
+def calcular_comissao_modelo(totais, modelo, parametros):
+    """
+    Aplica as regras do modelo (ver compilar_modelo_comissao) a um array de totais cujo último eixo
+    são os vendedores. Retorna o dicionário com percentual, comissao, meta_atingida e meta_valor.
+    """
+    return compilar_modelo_comissao(modelo, parametros)(totais)
+
+# Função para conferir se os parâmetros informados bastam para calcular o modelo de comissão
+def validar_parametros_comissao(modelo, parametros):
+    """
+    Confere os parâmetros que o modelo usa (salário base, percentuais, meta e faixas) sem recorrer
+    aos valores de PARAMETROS_PADRAO_COMISSAO, que mascarariam um parâmetro esquecido.
+
+    Args:
+        modelo: Nome do modelo em MODELOS_COMISSAO
+        parametros: Dicionário com parâmetros do modelo
+
+    Returns:
+        Lista com a descrição de cada problema encontrado (vazia se os parâmetros são válidos)
+    """
+    def numero(valor, aceita_infinito=False):
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            return False
+        return not np.isnan(valor) and (aceita_infinito or np.isfinite(valor))
+
+    especificacao = MODELOS_COMISSAO[modelo]
+    problemas = []
+
+    # Salário base e percentuais simples
+    obrigatorios = ['salario_base'] + [regra['parametro'] for regra in especificacao['regras'] if regra['tipo'] == 'percentual']
+
+    # Meta: o tipo define se o modelo usa o valor fixo ou o percentual acima da média
+    if especificacao['meta']:
+        meta_tipo = parametros.get('meta_tipo')
+        if meta_tipo == 'valor':
+            obrigatorios.append('meta_valor')
+        elif meta_tipo == 'media':
+            obrigatorios.append('meta_percentual')
+        else:
+            problemas.append("meta_tipo deve ser 'valor' ou 'media'")
+
+    problemas = [f"{nome} ausente ou não numérico" for nome in obrigatorios if not numero(parametros.get(nome))] + problemas
+
+    # Faixas: lista não vazia com os campos numéricos de cada faixa (valor_max pode ser infinito)
+    campos_faixas = {'faixas': ('valor_min', 'valor_max', 'comissao_pct'), 'faixas_meta': ('atingimento_min', 'comissao_pct')}
+    for regra in especificacao['regras']:
+        if regra['tipo'] not in campos_faixas:
+            continue
+        faixas = parametros.get(regra['parametro'])
+        campos = campos_faixas[regra['tipo']]
+        if not isinstance(faixas, list) or not faixas:
+            problemas.append(f"{regra['parametro']} ausente ou vazio")
+        elif not all(isinstance(faixa, dict) and all(numero(faixa.get(campo), campo == 'valor_max') for campo in campos)
+                     for faixa in faixas):
+            problemas.append(f"cada item de {regra['parametro']} precisa de {', '.join(campos)} numéricos")
+
+    if parametros.get('modo_faixas', 'faixa') not in ('faixa', 'marginal'):
+        problemas.append("modo_faixas deve ser 'faixa' ou 'marginal'")
+
+    return problemas
+
+# Função que simula um lote de períodos futuros (executada em um processo do pool)
+def simular_lote_monte_carlo(semanas, inicios_meses, modelo, parametros_mes, qtd_simulacoes, semente):
+    """
+    Sorteia semanas inteiras do histórico (bootstrap em blocos semanais, preservando o padrão dos
+    dias da semana e a correlação entre vendedores), soma as semanas de cada mês simulado e aplica
+    o modelo de comissão mês a mês. Retorna custo da folha, vendas e metas atingidas por vendedor.
+    """
+    rng = np.random.default_rng(semente)
+    sorteio = rng.integers(0, len(semanas), size=(qtd_simulacoes, inicios_meses[-1]))
+    
+    # Vendas de cada mês simulado: simulações x meses x vendedores
+    totais_mes = np.add.reduceat(semanas[sorteio], inicios_meses[:-1], axis=1)
+    resultado = calcular_comissao_modelo(totais_mes, modelo, parametros_mes)
+    comissao, meta_atingida = resultado['comissao'], resultado['meta_atingida']
+    
+    qtd_meses, qtd_vendedores = totais_mes.shape[1:]
+    salario_base = parametros_mes.get('salario_base', PARAMETROS_PADRAO_COMISSAO['salario_base'])
+    custo_folha = salario_base * qtd_meses * qtd_vendedores + comissao.sum(axis=(1, 2))
+    metas_atingidas = meta_atingida.sum(axis=(0, 1)) if meta_atingida is not None else None
+    return custo_folha, totais_mes.sum(axis=(1, 2)), metas_atingidas
@@ -34,10 +34,28 @@ CONFIG = {
     "allowed_extensions": [".xlsx", ".xls"],
     
     # Opções de cache - pode ser 'memory' ou 'disk'
-    "cache_type": "memory",
+    # 'disk' também grava os dados processados em Parquet na subpasta "cache" de data_folder,
+    # evitando reler a planilha Excel quando o mesmo arquivo for aberto novamente
+    "cache_type": "disk",
     
-    # Tempo de expiração do cache em segundos (3600 = 1 hora)
+    # Tempo de expiração do cache em memória em segundos (3600 = 1 hora)
     "cache_ttl": 3600,
+    
+    # Valores exatos: guarda os valores em centavos inteiros desde a leitura da planilha, para que
+    # totais e comissões batam centavo a centavo com o ERP (False = valores em float, como antes)
+    "valores_em_centavos": False,
+    
+    # Memória máxima (em MB) dos dados processados compartilhados entre as sessões; acima dela,
+    # os arquivos que nenhuma sessão está usando são descartados, do menos usado para o mais usado
+    "memoria_conjuntos_mb": 2048,
+    
+    # Retenção dos uploads guardados em data_folder/uploads (em horas): cada cópia é apagada quando
+    # nenhuma sessão usa mais os dados dela ou quando passa desse prazo sem ser reenviada
+    "retencao_uploads_horas": 24,
+    
+    # Retenção do cache em disco em data_folder/cache (em horas): os dados processados que não são
+    # abertos nesse prazo são apagados, assim como os gravados por outra versão do dashboard
+    "retencao_cache_horas": 24,
 }
 
 # Verificar e criar pasta de dados se não existir
@@ -0,0 +1,29 @@
+"""
+Configuração dos testes do Dashboard Gerencial de Vendas
+
+Os testes importam insight.py fora do `streamlit run` (modo "bare" do Streamlit): a página é
+executada uma vez na importação, sem dados carregados, e as funções ficam disponíveis no módulo.
+"""
+
+import os
+import sys
+import warnings
+
+import pytest
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+
+
+@pytest.fixture(scope="session")
+def insight():
+    """Módulo insight.py importado a partir da pasta do projeto"""
+    diretorio_anterior = os.getcwd()
+    os.chdir(PASTA_PROJETO)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            import insight as modulo
+    finally:
+        os.chdir(diretorio_anterior)
+    return modulo
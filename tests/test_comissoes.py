@@ -0,0 +1,22 @@
+"""
+Arredondamento das comissões para o centavo (modo de valores exatos)
+"""
+
+import numpy as np
+
+from comissoes import arredondar_centavos
+
+
+def test_meio_centavo_sobe():
+    valores = np.array([0.125, 0.135, 0.145, 1.005, 2.675, 100.5 * 0.01, 1234.565, 0.124999, 0.0])
+    esperado = np.array([0.13, 0.14, 0.15, 1.01, 2.68, 1.01, 1234.57, 0.12, 0.0])
+    np.testing.assert_array_equal(arredondar_centavos(valores), esperado)
+
+
+def test_negativos_afastam_do_zero():
+    np.testing.assert_array_equal(arredondar_centavos([-0.125, -1.005, -0.124]), [-0.13, -1.01, -0.12])
+
+
+def test_formato_e_nulos_preservados():
+    valores = np.array([[0.5, np.nan], [10.0, 3.333]])
+    np.testing.assert_array_equal(arredondar_centavos(valores), [[0.5, np.nan], [10.0, 3.33]])
@@ -0,0 +1,91 @@
+"""
+Paridade entre a conversão vetorizada de valores (converter_serie_valor_br_para_float) e a
+conversão linha a linha (converter_valor_br_para_float), que define o comportamento esperado
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Casos de borda: cada célula deve dar exatamente o mesmo resultado nas duas conversões
+CORPUS_VALORES = [
+    # Células vazias e nulas
+    None, np.nan, pd.NA, "", "   ", "\t\n",
+    # Só o símbolo da moeda
+    "R$", "R$ ", " R$  ", "US$", "€", "£",
+    # Formato brasileiro, americano e vírgula decimal
+    "1.234,56", "1,234.56", "12,5", "12,34", "1,2345", "1,234", "1,50", "1,500",
+    "1.234.567,89", "1,234,567.89", "12.345.678", "10.5", "1.000", "0", "0,00",
+    # Prefixos e sufixos de moeda, espaços e espaço rígido
+    "R$ 1.234,56", "R$1,00", "R$ 10", "  99 ", "1.234,56 R$", "US$ 5", "€ 3,20", "£7",
+    "\xa010,00", "R$\xa01.234,56", "R$ 1 234,56", "12 34",
+    # Negativos e sinais
+    "-5", "+5", "-1.234,5", "R$ -12,30", "-0,00", "--5", "- 5", "5-", "+-5", "-R$ 5,00",
+    # Separadores repetidos ou nas pontas
+    "1..2", "1,,2", "12,,3", "1.2.3", "1,2,3", "1.000,", ".5", ",5", "5,", "5.", ".", ",", "-",
+    # Caracteres estranhos
+    "abc", "12abc", "x1,5y", "1_000", "1e3", "1E-2", "inf", "Infinity", "nan", "٣", "12%", "(12,50)",
+    # Muitos dígitos (mais de 15) e textos longos
+    "1234567890123456", "123456789012345", "98765432109876543", "0,1234567890123456",
+    "9.876.543.210.987.654,32", "6660,9592381036183", "30,188851359254557", "98724430707163,294",
+    "R$ 1.234.567.890.123,45", "                  1,5                  ",
+    # Células já numéricas
+    0, 3, -7, 4.5, -0.0, 1e15, 12345.678, np.float32(2.5), np.int64(42)
+]
+
+
+def converter_linha_a_linha(insight, valores):
+    return np.array([insight.converter_valor_br_para_float(valor) for valor in valores], dtype=float)
+
+
+def assert_mesmos_floats(obtido, esperado):
+    """Igualdade exata, com NaN igual a NaN e distinção entre 0.0 e -0.0"""
+    obtido = np.asarray(obtido, dtype=float)
+    np.testing.assert_array_equal(obtido, esperado)
+    np.testing.assert_array_equal(np.signbit(obtido), np.signbit(esperado))
+
+
+def test_corpus_igual_a_conversao_linha_a_linha(insight):
+    serie = pd.Series(CORPUS_VALORES, dtype=object)
+    obtido, _ = insight.converter_serie_valor_br_para_float(serie)
+    assert_mesmos_floats(obtido, converter_linha_a_linha(insight, CORPUS_VALORES))
+
+
+@pytest.mark.parametrize("tipo", [object, "string"])
+def test_corpus_em_blocos_e_tipos_de_texto(insight, tipo):
+    # Repetir o corpus para ultrapassar o tamanho de um bloco da conversão vetorizada
+    repeticoes = insight.TAMANHO_BLOCO_VALORES // len(CORPUS_VALORES) + 2
+    textos = [valor for valor in CORPUS_VALORES if isinstance(valor, str)] * repeticoes
+    serie = pd.Series(textos, dtype=tipo)
+    obtido, _ = insight.converter_serie_valor_br_para_float(serie)
+    assert_mesmos_floats(obtido, converter_linha_a_linha(insight, textos))
+
+
+def test_valores_formatados_aleatorios(insight):
+    rng = np.random.default_rng(20)
+    valores = rng.gamma(2, 1000, 20000).round(2) * rng.choice([-1, 1], 20000)
+    textos = (
+        [f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for x in valores[:5000]] +
+        [f"{x:,.2f}" for x in valores[5000:10000]] +
+        [f"{x:.2f}".replace(".", ",") for x in valores[10000:15000]] +
+        [repr(float(x * 1.001)) for x in valores[15000:]]
+    )
+    obtido, qtd_invalidos = insight.converter_serie_valor_br_para_float(pd.Series(textos, dtype=object))
+    assert_mesmos_floats(obtido, converter_linha_a_linha(insight, textos))
+    assert qtd_invalidos == 0
+
+
+def test_contagem_de_celulas_invalidas(insight):
+    # Células preenchidas que não viram número são contadas; vazias e só "R$" não
+    serie = pd.Series(["1,00", "abc", "", None, "R$", "x", "1.2.3.4,5,6", "2,50"], dtype=object)
+    obtido, qtd_invalidos = insight.converter_serie_valor_br_para_float(serie)
+    esperado = converter_linha_a_linha(insight, serie)
+    assert_mesmos_floats(obtido, esperado)
+    assert qtd_invalidos == int(np.isnan(esperado[[1, 5, 6]]).sum())
+
+
+def test_coluna_numerica_nao_e_convertida_como_texto(insight):
+    serie = pd.Series([1, 2.5, np.nan, -3])
+    obtido, qtd_invalidos = insight.converter_serie_valor_br_para_float(serie)
+    assert_mesmos_floats(obtido, converter_linha_a_linha(insight, serie))
+    assert qtd_invalidos == 0